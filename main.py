@@ -1,12 +1,18 @@
+import io
+import re
+import sys
 from datetime import datetime
 from typing import Optional
 
-from temporal_db import TemporalDB
-
 DATE_FMT = "%d/%m/%Y"
 DATETIME_FMT = "%d/%m/%Y %H:%M"
 TIME_FMT = "%H:%M"
 
+# precompiled fast paths for the fixed formats above, so the common case
+# skips strptime's per-call format-string parsing
+_DATE_RE = re.compile(r"(\d{2})/(\d{2})/(\d{4})$")
+_DT_RE = re.compile(r"(\d{2})/(\d{2})/(\d{4}) (\d{2}):(\d{2})$")
+
 
 class GoBack(Exception):
     pass
@@ -22,10 +28,17 @@ def smart_input(prompt: str) -> str:
     b = back (throw GoBack)
     m = menu (throw GoMenu)
     """
-    val = input(prompt + "  [b = back, m = menu]: ").strip()
-    if val.lower() == "b":
+    # one buffered write + one read instead of input()'s per-prompt roundtrips
+    sys.stdout.write(prompt + "  [b = back, m = menu]: ")
+    sys.stdout.flush()
+    line = sys.stdin.readline()
+    if not line:
+        raise EOFError("EOF when reading a line")
+    val = line.strip()
+    low = val.lower()
+    if low == "b":
         raise GoBack()
-    if val.lower() == "m":
+    if low == "m":
         raise GoMenu()
     return val
 
@@ -33,8 +46,11 @@ def smart_input(prompt: str) -> str:
 def read_date(prompt: str) -> datetime:
     while True:
         try:
-            s = smart_input(f"{prompt} (format {DATE_FMT})")
-            return datetime.strptime(s.strip(), DATE_FMT)
+            s = smart_input(f"{prompt} (format {DATE_FMT})").strip()
+            m = _DATE_RE.match(s)
+            if m:
+                return datetime(int(m[3]), int(m[2]), int(m[1]))
+            return datetime.strptime(s, DATE_FMT)
         except GoBack:
             # נעביר את האות למעלה כדי שהקריאה תדע לחזור אחורה
             raise
@@ -66,8 +82,11 @@ def read_optional_time(prompt: str) -> Optional[datetime.time]:
 def read_datetime(prompt: str) -> datetime:
     while True:
         try:
-            s = smart_input(f"{prompt} (format {DATETIME_FMT})")
-            return datetime.strptime(s.strip(), DATETIME_FMT)
+            s = smart_input(f"{prompt} (format {DATETIME_FMT})").strip()
+            m = _DT_RE.match(s)
+            if m:
+                return datetime(int(m[3]), int(m[2]), int(m[1]), int(m[4]), int(m[5]))
+            return datetime.strptime(s, DATETIME_FMT)
         except GoBack:
             raise
         except GoMenu:
@@ -111,7 +130,11 @@ def show_help():
 
 
 def main():
-    db: Optional[TemporalDB] = None
+    db = None
+
+    # rewrap stdout without write-through so adjacent prints coalesce into
+    # one syscall; prompts flush explicitly before reading
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", write_through=False)
 
     print("Temporal Database Project (Bi-temporal DB)")
     print("==========================================")
@@ -135,6 +158,10 @@ def main():
                 loinc_path = "Loinc.csv"
 
             try:
+                # imported here so the menu comes up without paying for
+                # pandas/NumPy until data is actually loaded
+                from temporal_db import TemporalDB
+
                 db = TemporalDB(excel_path, loinc_path)
                 print("Data loaded successfully.")
                 print(f"System current time is: {db.current_time}")
@@ -176,18 +203,22 @@ def main():
                     if result is None:
                         print("No measurement found for the given criteria.")
                     else:
-                        print("\nResult:")
-                        print(f"Patient: {result['first_name']} {result['last_name']}")
-                        print(f"LOINC: {result['loinc']} ({result['long_common_name']})")
+                        lines = [
+                            "",
+                            "Result:",
+                            f"Patient: {result['first_name']} {result['last_name']}",
+                            f"LOINC: {result['loinc']} ({result['long_common_name']})",
+                        ]
                         unit = result['unit']
                         if unit is None or str(unit).lower() == "nan":
-                            print(f"Value: {result['value']}")
+                            lines.append(f"Value: {result['value']}")
                         else:
-                            print(f"Value: {result['value']} {unit}")
-
-                        print(f"Valid time: {result['valid_time']}")
-                        print(f"System from: {result['system_from']}")
-                        print(f"System to: {result['system_to']}")
+                            lines.append(f"Value: {result['value']} {unit}")
+                        lines.append(f"Valid time: {result['valid_time']}")
+                        lines.append(f"System from: {result['system_from']}")
+                        lines.append(f"System to: {result['system_to']}")
+                        # one write instead of eight print calls
+                        sys.stdout.write("\n".join(lines) + "\n")
 
                 except GoBack:
                     print("↩ Returning to previous step...\n")
@@ -218,14 +249,20 @@ def main():
                     if not history:
                         print("No history records found in this range.")
                     else:
-                        print(f"\nFound {len(history)} records:")
-                        for rec in history:
-                            print("--------------------------------")
-                            print(f"Valid time: {rec['valid_time']}")
-                            print(f"Value: {rec['value']} {rec['unit']}")
-                            print(f"System from: {rec['system_from']}")
-                            print(f"System to: {rec['system_to']}")
-                            print(f"Test: {rec['long_common_name']}")
+                        # pre-format each record's block and emit everything
+                        # in a single write
+                        blocks = [
+                            f"Valid time: {rec['valid_time']}\n"
+                            f"Value: {rec['value']} {rec['unit']}\n"
+                            f"System from: {rec['system_from']}\n"
+                            f"System to: {rec['system_to']}\n"
+                            f"Test: {rec['long_common_name']}"
+                            for rec in history
+                        ]
+                        sep = "\n--------------------------------\n"
+                        sys.stdout.write(
+                            f"\nFound {len(history)} records:" + sep + sep.join(blocks) + "\n"
+                        )
                 except GoBack:
                     print("↩ Returning to previous step...\n")
                 except GoMenu:
@@ -1,10 +1,69 @@
+import os
+import sys
+from collections import defaultdict
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional, List, Dict
-import pandas as pd
+from datetime import date as date_type, datetime
+from operator import attrgetter
+from typing import Optional, List, Dict, Tuple
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; fall back to NumPy masks
+    njit = None
+
+
+if njit is not None:
+
+    @njit(cache=True, parallel=True)
+    def _candidate_mask(fn_codes, ln_codes, loinc_codes, valid_ns,
+                        fn_q, ln_q, loinc_q, lo_ns, hi_ns):
+        """Fused key + valid-range predicate: one parallel pass, no temporaries."""
+        n = fn_codes.shape[0]
+        out = np.empty(n, dtype=np.bool_)
+        for i in prange(n):
+            out[i] = (
+                fn_codes[i] == fn_q
+                and ln_codes[i] == ln_q
+                and loinc_codes[i] == loinc_q
+                and lo_ns <= valid_ns[i] < hi_ns
+            )
+        return out
+
+else:
+
+    def _candidate_mask(fn_codes, ln_codes, loinc_codes, valid_ns,
+                        fn_q, ln_q, loinc_q, lo_ns, hi_ns):
+        return (
+            (fn_codes == fn_q)
+            & (ln_codes == ln_q)
+            & (loinc_codes == loinc_q)
+            & (valid_ns >= lo_ns)
+            & (valid_ns < hi_ns)
+        )
+
+
+_SYSFROM = attrgetter("system_from")
+_VALIDTIME = attrgetter("valid_time")
+
+_EPOCH = datetime(1970, 1, 1)
+
 
+def _to_ns(dt: datetime) -> int:
+    """Naive datetime -> integer nanoseconds since the epoch (exact)."""
+    td = dt - _EPOCH
+    return (td.days * 86_400 + td.seconds) * 1_000_000_000 + td.microseconds * 1_000
 
-@dataclass
+
+_MAX_NS = _to_ns(datetime.max)  # sentinel matching system_to == datetime.max
+
+# int64-ns arrays only cover ~1677-2262; bounds outside get saturated to
+# these instead of letting a datetime64 cast wrap around
+_NS_I64_MAX = (1 << 63) - 1
+_NS_I64_MIN = 1 - (1 << 63)  # keep clear of the NaT sentinel at -2**63
+
+
+@dataclass(slots=True)
 class TemporalRecord:
     first_name: str
     last_name: str
@@ -12,8 +71,26 @@ class TemporalRecord:
     value: str
     unit: str
     valid_time: datetime          # valid time (measurement time)
+    valid_date: date_type         # valid_time.date(), precomputed once at load
     system_from: datetime         # transaction time (when this version was inserted)
-    system_to: Optional[datetime] # None = still valid
+    system_to: datetime           # datetime.max = still valid (open version)
+    # the same three instants as integer nanoseconds, so the hot interval
+    # checks compare plain ints instead of datetime objects
+    valid_time_ns: int = 0
+    system_from_ns: int = 0
+    system_to_ns: int = _MAX_NS
+
+    def __repr__(self) -> str:
+        # user-facing form: hide the derived/ns fields and show open
+        # versions as system_to=None like before the sentinel change
+        system_to = None if self.system_to == datetime.max else self.system_to
+        return (
+            f"TemporalRecord(first_name={self.first_name!r}, "
+            f"last_name={self.last_name!r}, loinc_num={self.loinc_num!r}, "
+            f"value={self.value!r}, unit={self.unit!r}, "
+            f"valid_time={self.valid_time!r}, system_from={self.system_from!r}, "
+            f"system_to={system_to!r})"
+        )
 
 
 class TemporalDB:
@@ -21,51 +98,175 @@ class TemporalDB:
         self.current_time: datetime = datetime.now()
         self.records: List[TemporalRecord] = []
         self.loinc_name: Dict[str, str] = {}
+        # index: (first_name, last_name, loinc_num) -> still-open versions only
+        # (system_to == datetime.max); closed versions drop out on update/delete
+        self._open_by_key: Dict[Tuple[str, str, str], List[TemporalRecord]] = defaultdict(list)
+        # columnar (SoA) copies of the immutable record fields, row-aligned with
+        # self.records, so query predicates run as vectorized NumPy masks.
+        # system_to is mutable (logical close) and stays on the records only.
+        self.cols: Dict[str, np.ndarray] = {}
+        # string -> integer code maps backing the *_code columns, so the
+        # candidate-mask kernel compares plain int64s
+        self._codes: Dict[str, Dict[str, int]] = {}
 
         self._load_excel(excel_path)
         self._load_loinc(loinc_csv_path)
 
     # ---------- loading data ----------
 
+    @staticmethod
+    def _is_cache_fresh(cache_path: str, source_path: str) -> bool:
+        return os.path.exists(cache_path) and os.path.getmtime(
+            cache_path
+        ) >= os.path.getmtime(source_path)
+
+    @staticmethod
+    def _write_cache(df: "pd.DataFrame", cache_path: str) -> None:
+        try:
+            df.to_parquet(cache_path)
+        except Exception:
+            # no parquet engine / read-only directory: just skip the cache
+            pass
+
     def _load_excel(self, excel_path: str) -> None:
-        df = pd.read_excel(excel_path)
-
-        for _, row in df.iterrows():
-            self.records.append(
-                TemporalRecord(
-                    first_name=row["First name"],
-                    last_name=row["Last name"],
-                    loinc_num=str(row["LOINC-NUM"]),
-                    value=str(row["Value"]),
-                    unit=row["Unit"],
-                    valid_time=pd.to_datetime(row["Valid start time"]).to_pydatetime(),
-                    system_from=pd.to_datetime(row["Transaction time"]).to_pydatetime(),
-                    system_to=None,
-                )
+        import pandas as pd  # deferred: keeps CLI startup fast until a load
+
+        # Excel parsing is slow (pure-Python XML), so cache the parsed frame
+        # to a Parquet sidecar and reuse it while the source is unchanged.
+        cache = excel_path + ".parquet"
+        if self._is_cache_fresh(cache, excel_path):
+            df = pd.read_parquet(cache)
+        else:
+            df = pd.read_excel(excel_path)
+            df["Value"] = df["Value"].astype(str)
+            self._write_cache(df, cache)
+
+        # Parse the datetime columns once (vectorized) instead of per row.
+        valid_col = pd.to_datetime(df["Valid start time"])
+        system_col = pd.to_datetime(df["Transaction time"])
+
+        # intern the recurring strings so equality checks can short-circuit
+        # on pointer identity instead of comparing bytes
+        def intern_col(col):
+            return np.array([sys.intern(s) for s in col.astype(str)], dtype=object)
+
+        self.cols = {
+            "first_name": intern_col(df["First name"]),
+            "last_name": intern_col(df["Last name"]),
+            "loinc_num": intern_col(df["LOINC-NUM"]),
+            "valid_time": valid_col.to_numpy().astype("datetime64[ns]"),
+            "system_from": system_col.to_numpy().astype("datetime64[ns]"),
+        }
+        for name in ("first_name", "last_name", "loinc_num"):
+            mapping: Dict[str, int] = {}
+            self._codes[name] = mapping
+            self.cols[name + "_code"] = np.array(
+                [mapping.setdefault(s, len(mapping)) for s in self.cols[name]],
+                dtype=np.int64,
             )
 
+        for first_name, last_name, loinc_num, value, unit, valid_time, system_from, vt_ns, sf_ns in zip(
+            self.cols["first_name"],
+            self.cols["last_name"],
+            self.cols["loinc_num"],
+            df["Value"].astype(str).values,
+            df["Unit"].values,
+            valid_col.dt.to_pydatetime(),
+            system_col.dt.to_pydatetime(),
+            self.cols["valid_time"].view(np.int64).tolist(),
+            self.cols["system_from"].view(np.int64).tolist(),
+        ):
+            rec = TemporalRecord(
+                first_name=first_name,
+                last_name=last_name,
+                loinc_num=loinc_num,
+                value=value,
+                unit=unit,
+                valid_time=valid_time,
+                valid_date=valid_time.date(),
+                system_from=system_from,
+                system_to=datetime.max,
+                valid_time_ns=vt_ns,
+                system_from_ns=sf_ns,
+            )
+            self.records.append(rec)
+            self._open_by_key[(rec.first_name, rec.last_name, rec.loinc_num)].append(rec)
+
     def _load_loinc(self, loinc_csv_path: str) -> None:
-        loinc_df = pd.read_csv(loinc_csv_path)
+        import pandas as pd  # deferred: keeps CLI startup fast until a load
+
+        cache = loinc_csv_path + ".parquet"
+        if self._is_cache_fresh(cache, loinc_csv_path):
+            loinc_df = pd.read_parquet(cache)
+        else:
+            # only the two columns we actually use out of the full LOINC table,
+            # parsed with the multi-threaded pyarrow engine when available
+            read_kwargs = dict(
+                usecols=["LOINC_NUM", "LONG_COMMON_NAME"],
+                dtype={"LOINC_NUM": "string", "LONG_COMMON_NAME": "string"},
+            )
+            try:
+                loinc_df = pd.read_csv(loinc_csv_path, engine="pyarrow", **read_kwargs)
+            except ImportError:
+                loinc_df = pd.read_csv(loinc_csv_path, **read_kwargs)
+            self._write_cache(loinc_df, cache)
 
         # חשוב: אם בעמודות בקובץ שלך השמות קצת שונים,
         # למשל "LOINC_NUM" או "LONG_COMMON_NAME ",
         # תעדכן כאן בהתאם.
-        self.loinc_name = {
-            str(row["LOINC_NUM"]): row["LONG_COMMON_NAME"]
-            for _, row in loinc_df.iterrows()
-        }
+        self.loinc_name = dict(
+            zip(loinc_df["LOINC_NUM"].astype(str), loinc_df["LONG_COMMON_NAME"])
+        )
 
     # ---------- helpers ----------
 
     def set_current_time(self, t: datetime) -> None:
         self.current_time = t
 
-    def _is_alive_at(self, rec: TemporalRecord, t: datetime) -> bool:
-        if rec.system_from > t:
-            return False
-        if rec.system_to is not None and rec.system_to <= t:
-            return False
-        return True
+    def _is_alive_at(self, rec: TemporalRecord, t_ns: int) -> bool:
+        return rec.system_from_ns <= t_ns < rec.system_to_ns
+
+    def _candidate_indices(
+        self, first_name: str, last_name: str, loinc_num: str, lo_ns: int, hi_ns: int
+    ) -> np.ndarray:
+        """Row indices matching the key whose valid_time is in [lo_ns, hi_ns)."""
+        fn_q = self._codes["first_name"].get(first_name, -1)
+        ln_q = self._codes["last_name"].get(last_name, -1)
+        loinc_q = self._codes["loinc_num"].get(loinc_num, -1)
+        if -1 in (fn_q, ln_q, loinc_q):
+            return np.empty(0, dtype=np.int64)
+        # saturate out-of-range bounds (e.g. a "to 31/12/9999" query) so the
+        # kernel sees valid int64s instead of wrapped values
+        lo_ns = max(_NS_I64_MIN, min(lo_ns, _NS_I64_MAX))
+        hi_ns = max(_NS_I64_MIN, min(hi_ns, _NS_I64_MAX))
+        mask = _candidate_mask(
+            self.cols["first_name_code"],
+            self.cols["last_name_code"],
+            self.cols["loinc_num_code"],
+            self.cols["valid_time"].view(np.int64),
+            fn_q,
+            ln_q,
+            loinc_q,
+            lo_ns,
+            hi_ns,
+        )
+        return np.flatnonzero(mask)
+
+    def _append_to_cols(self, rec: TemporalRecord) -> None:
+        """Keep the column arrays row-aligned with self.records."""
+        for name in ("first_name", "last_name", "loinc_num"):
+            value = getattr(rec, name)
+            self.cols[name] = np.append(self.cols[name], value)
+            mapping = self._codes[name]
+            self.cols[name + "_code"] = np.append(
+                self.cols[name + "_code"], mapping.setdefault(value, len(mapping))
+            )
+        self.cols["valid_time"] = np.append(
+            self.cols["valid_time"], np.datetime64(rec.valid_time, "ns")
+        )
+        self.cols["system_from"] = np.append(
+            self.cols["system_from"], np.datetime64(rec.system_from, "ns")
+        )
 
     # ---------- queries ----------
 
@@ -92,49 +293,61 @@ class TemporalDB:
 
         if perspective_time is None:
             perspective_time = self.current_time
+        persp_ns = _to_ns(perspective_time)
+
+        # intern the lookup strings so they compare by identity with the
+        # interned record fields
+        first_name = sys.intern(first_name)
+        last_name = sys.intern(last_name)
+        loinc_num = sys.intern(loinc_num)
 
         # Filter records by patient, LOINC code, and valid-date (same day)
-        candidates = [
-            r
-            for r in self.records
-            if r.first_name == first_name
-               and r.last_name == last_name
-               and r.loinc_num == loinc_num
-               and r.valid_time.date() == date.date()
-        ]
+        # with the fused candidate kernel over the [day, day+1) ns range
+        qdate = date.date()
+        day_lo = _to_ns(datetime(qdate.year, qdate.month, qdate.day))
+        day_hi = day_lo + 86_400_000_000_000
+        idx = self._candidate_indices(first_name, last_name, loinc_num, day_lo, day_hi)
+        candidates = [self.records[i] for i in idx]
 
         if not candidates:
             return None
 
-        # Case 1: Exact time is provided → must match exactly
+        # Case 1: Exact time is provided → must match exactly.
+        # Single pass: time match + aliveness + latest system_from.
         if time is not None:
-            same_time = [r for r in candidates if r.valid_time.time() == time]
-            if not same_time:
+            qtime = time
+            best = None
+            for r in candidates:
+                if r.valid_time.time() != qtime:
+                    continue
+                if not (r.system_from_ns <= persp_ns < r.system_to_ns):
+                    continue
+                # among versions of the same valid time, keep the latest
+                # transaction time (system_from)
+                if best is None or r.system_from > best.system_from:
+                    best = r
+            if best is None:
                 return None
 
-            # Keep only records that are alive at the given perspective time
-            alive = [r for r in same_time if self._is_alive_at(r, perspective_time)]
-            if not alive:
-                return None
-
-            # If multiple versions exist for the same valid time,
-            # choose the one with the latest transaction time (system_from)
-            best = max(alive, key=lambda r: r.system_from)
-
-        # Case 2: Only date is provided → choose the latest alive measurement of that day
+        # Case 2: Only date is provided → choose the latest alive measurement
+        # of that day: lexsort the alive rows by (valid_time, system_from) on
+        # the column arrays and take the last one.
         else:
-            # First, keep only records that are alive at the perspective time
-            alive = [r for r in candidates if self._is_alive_at(r, perspective_time)]
-            if not alive:
+            alive_idx = [
+                i
+                for i, r in zip(idx, candidates)
+                if r.system_from_ns <= persp_ns < r.system_to_ns
+            ]
+            if not alive_idx:
                 return None
-
-            # Find the latest valid_time among alive records
-            max_valid = max(r.valid_time for r in alive)
-            latest_same_time = [r for r in alive if r.valid_time == max_valid]
-
-            # If multiple versions exist for the same latest valid_time,
-            # choose the one with the latest transaction time
-            best = max(latest_same_time, key=lambda r: r.system_from)
+            sub = np.asarray(alive_idx, dtype=np.int64)
+            order = np.lexsort(
+                (
+                    self.cols["system_from"][sub].view(np.int64),
+                    self.cols["valid_time"][sub].view(np.int64),
+                )
+            )
+            best = self.records[int(sub[order[-1]])]
 
         # Map LOINC number to its official long common name
         long_name = self.loinc_name.get(loinc_num, loinc_num)
@@ -148,7 +361,7 @@ class TemporalDB:
             "unit": best.unit,
             "valid_time": best.valid_time,
             "system_from": best.system_from,
-            "system_to": best.system_to,
+            "system_to": best.system_to if best.system_to != datetime.max else None,
         }
 
     def query_history(
@@ -167,42 +380,43 @@ class TemporalDB:
         if tx_to is None:
             tx_to = self.current_time
 
-        # filter by patient + loinc + valid range
-        candidates = [
-            r
-            for r in self.records
-            if r.first_name == first_name
-            and r.last_name == last_name
-            and r.loinc_num == loinc_num
-            and valid_from <= r.valid_time <= valid_to
-        ]
+        first_name = sys.intern(first_name)
+        last_name = sys.intern(last_name)
+        loinc_num = sys.intern(loinc_num)
+        tx_from_ns = _to_ns(tx_from)
+        tx_to_ns = _to_ns(tx_to)
 
-        # transaction-time range (basic version)
-        tx_filtered = [r for r in candidates if tx_from <= r.system_from <= tx_to]
+        # filter by patient + loinc + valid range with the fused candidate kernel
+        lo = _to_ns(valid_from)
+        hi = _to_ns(valid_to) + 1
+        idx = self._candidate_indices(first_name, last_name, loinc_num, lo, hi)
+        candidates = [self.records[i] for i in idx]
 
-        # group by valid_time and keep only latest system_from
+        # single pass: apply the transaction-time range and group by valid_time,
+        # keeping only the version with the latest system_from
         groups: Dict[datetime, TemporalRecord] = {}
-        for r in tx_filtered:
-            key = r.valid_time
-            if key not in groups or groups[key].system_from < r.system_from:
-                groups[key] = r
+        for r in candidates:
+            if not (tx_from_ns <= r.system_from_ns <= tx_to_ns):
+                continue
+            g = groups.get(r.valid_time)
+            if g is None or g.system_from < r.system_from:
+                groups[r.valid_time] = r
 
         long_name = self.loinc_name.get(loinc_num, loinc_num)
 
-        result = []
-        for vt in sorted(groups.keys()):
-            rec = groups[vt]
-            result.append(
-                {
-                    "valid_time": rec.valid_time,
-                    "value": rec.value,
-                    "unit": rec.unit,
-                    "system_from": rec.system_from,
-                    "system_to": rec.system_to,
-                    "long_common_name": long_name,
-                }
-            )
-        return result
+        return [
+            {
+                "valid_time": groups[vt].valid_time,
+                "value": groups[vt].value,
+                "unit": groups[vt].unit,
+                "system_from": groups[vt].system_from,
+                "system_to": groups[vt].system_to
+                if groups[vt].system_to != datetime.max
+                else None,
+                "long_common_name": long_name,
+            }
+            for vt in sorted(groups)
+        ]
 
     # ---------- updates ----------
 
@@ -218,25 +432,29 @@ class TemporalDB:
         """Logical update: close current version and insert new one."""
         if t_update is None:
             t_update = self.current_time
+        t_ns = _to_ns(t_update)
 
+        first_name = sys.intern(first_name)
+        last_name = sys.intern(last_name)
+        loinc_num = sys.intern(loinc_num)
+
+        key = (first_name, last_name, loinc_num)
         candidates = [
             r
-            for r in self.records
-            if r.first_name == first_name
-            and r.last_name == last_name
-            and r.loinc_num == loinc_num
-            and r.valid_time == valid_time
-            and self._is_alive_at(r, t_update)
+            for r in self._open_by_key.get(key, ())
+            if r.valid_time == valid_time and self._is_alive_at(r, t_ns)
         ]
 
         if not candidates:
             print("No record found to update.")
             return
 
-        current = max(candidates, key=lambda r: r.system_from)
+        current = max(candidates, key=_SYSFROM)
 
-        # close old version
+        # close old version and drop it from the open-versions index
         current.system_to = t_update
+        current.system_to_ns = t_ns
+        self._open_by_key[key].remove(current)
 
         # add new version
         new_rec = TemporalRecord(
@@ -246,10 +464,15 @@ class TemporalDB:
             value=new_value,
             unit=current.unit,
             valid_time=current.valid_time,
+            valid_date=current.valid_date,
             system_from=t_update,
-            system_to=None,
+            system_to=datetime.max,
+            valid_time_ns=current.valid_time_ns,
+            system_from_ns=t_ns,
         )
         self.records.append(new_rec)
+        self._open_by_key[key].append(new_rec)
+        self._append_to_cols(new_rec)
 
         print("Update done.")
         print("Old version:", current)
@@ -267,15 +490,18 @@ class TemporalDB:
         """Logical delete: close last version for that measurement."""
         if t_delete is None:
             t_delete = self.current_time
+        t_ns = _to_ns(t_delete)
+
+        first_name = sys.intern(first_name)
+        last_name = sys.intern(last_name)
+        loinc_num = sys.intern(loinc_num)
 
+        qdate = date.date()
+        key = (first_name, last_name, loinc_num)
         candidates = [
             r
-            for r in self.records
-            if r.first_name == first_name
-            and r.last_name == last_name
-            and r.loinc_num == loinc_num
-            and r.valid_time.date() == date.date()
-            and self._is_alive_at(r, t_delete)
+            for r in self._open_by_key.get(key, ())
+            if r.valid_date == qdate and self._is_alive_at(r, t_ns)
         ]
 
         if not candidates:
@@ -283,16 +509,19 @@ class TemporalDB:
             return
 
         if time is not None:
-            candidates = [r for r in candidates if r.valid_time.time() == time]
+            qtime = time
+            candidates = [r for r in candidates if r.valid_time.time() == qtime]
             if not candidates:
                 print("No record with this exact time.")
                 return
         else:
-            max_valid = max(r.valid_time for r in candidates)
+            max_valid = max(candidates, key=_VALIDTIME).valid_time
             candidates = [r for r in candidates if r.valid_time == max_valid]
 
-        target = max(candidates, key=lambda r: r.system_from)
+        target = max(candidates, key=_SYSFROM)
         target.system_to = t_delete
+        target.system_to_ns = t_ns
+        self._open_by_key[key].remove(target)
 
         print("Logical delete done. Record closed at:", t_delete)
         print(target)